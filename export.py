@@ -0,0 +1,188 @@
+"""
+Batch export / conversion of recorded data.
+
+Examples:
+    python export.py logs/output.csv -o logs/output.xlsx
+    python export.py logs/part1.csv logs/part2.csv -o logs/run.bin --decimate 10
+    python export.py logs/output.dat -o logs/converted.csv --convert multimeter.convert:convert --workers 4
+"""
+import argparse
+import importlib
+import logging
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from time import perf_counter
+import numpy as np
+import pandas as pd
+
+from multimeter.recording import OUTPUT_COLUMNS, RECORD_DTYPE, BINARY_SUFFIX, CHUNK_ROWS, \
+    read_chunks, format_datetime
+
+
+CONVERTED_COLUMN = "Converted"
+XLSX_MAX_ROWS = 1048576
+
+logger = logging.getLogger("Export")
+
+
+@lru_cache(maxsize=None)
+def load_function(spec):
+    """Imports "module:function" once per process"""
+    module_name, function_name = spec.split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def convert_chunk(timestamps, values, offset, decimate=1, convert=None):
+    """
+    Runs in a worker process: decimation (every n-th reading of the whole recording),
+    conversion function and the Datetime column
+    """
+    start = -offset % decimate
+    timestamps = timestamps[start::decimate]
+    values = values[start::decimate]
+    df = pd.DataFrame({
+        OUTPUT_COLUMNS[0]: timestamps,
+        OUTPUT_COLUMNS[1]: format_datetime(timestamps),
+        OUTPUT_COLUMNS[2]: values
+    })
+    if convert is not None:
+        df[CONVERTED_COLUMN] = load_function(convert)(values)
+    return df
+
+
+class ChunkWriter:
+    """Appends converted chunks to the output file, the format is chosen by the extension"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = None
+        self.workbook = None
+        self.sheet = None
+        self.sheet_rows = 0
+        self.n_rows = 0
+        if filename.endswith(".xlsx"):
+            from openpyxl import Workbook
+            # write-only mode streams rows to the file instead of keeping the sheet in memory
+            self.workbook = Workbook(write_only=True)
+        elif filename.endswith(BINARY_SUFFIX):
+            self.file = open(filename, "wb")
+        elif filename.endswith(".csv") or filename.endswith(".dat") or filename.endswith(".txt"):
+            self.file = open(filename, "w", newline="")
+        else:
+            raise ValueError("Incorrect filename. Please, use CSV / XLSX / DAT / TXT / BIN files for output")
+
+    def write(self, df):
+        if self.workbook is not None:
+            self.write_xlsx(df)
+        elif self.filename.endswith(BINARY_SUFFIX):
+            records = np.empty(len(df), dtype=RECORD_DTYPE)
+            records["ts"] = df[OUTPUT_COLUMNS[0]].to_numpy()
+            records["value"] = df[OUTPUT_COLUMNS[2]].to_numpy()
+            records.tofile(self.file)
+        else:
+            df.to_csv(
+                self.file,
+                sep="," if self.filename.endswith(".csv") else "\t",
+                index=False,
+                header=self.n_rows == 0
+            )
+        self.n_rows += len(df)
+
+    def write_xlsx(self, df):
+        rows = df.itertuples(index=False, name=None)
+        remaining = len(df)
+        while remaining:
+            if self.sheet is None or self.sheet_rows >= XLSX_MAX_ROWS:
+                # a sheet is limited to 1048576 rows, the next one continues with a new header
+                self.sheet = self.workbook.create_sheet(f"Sheet{len(self.workbook.worksheets) + 1}")
+                self.sheet.append(list(df.columns))
+                self.sheet_rows = 1
+            n = min(remaining, XLSX_MAX_ROWS - self.sheet_rows)
+            for _ in range(n):
+                self.sheet.append(next(rows))
+            self.sheet_rows += n
+            remaining -= n
+
+    def close(self):
+        if self.workbook is not None:
+            if self.sheet is None:
+                self.workbook.create_sheet("Sheet1").append(OUTPUT_COLUMNS)
+            self.workbook.save(self.filename)
+        elif self.file is not None:
+            self.file.close()
+
+
+def export(input_files, output_file, decimate=1, convert=None, workers=None, chunk_rows=CHUNK_ROWS):
+    """
+    Streams the input segments chunk by chunk through a process pool,
+    chunks are written in their original order and at most 2 chunks per worker are in memory
+    """
+    if decimate < 1:
+        raise ValueError("Decimation factor must be at least 1")
+    if convert is not None:
+        load_function(convert)  # fail early on a wrong spec
+        if output_file.endswith(BINARY_SUFFIX):
+            logger.warning(f"The binary format only stores the readings, \"{CONVERTED_COLUMN}\" is not exported")
+    # the decimation stays aligned across chunks
+    chunk_rows = max(chunk_rows // decimate, 1) * decimate
+    workers = workers or os.cpu_count()
+    writer = ChunkWriter(output_file)
+    n_read = 0
+    t0 = perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = deque()
+            for input_file in input_files:
+                logger.info(f"Reading {input_file}")
+                for df in read_chunks(input_file, chunk_rows=chunk_rows, usecols="numeric"):
+                    futures.append(pool.submit(
+                        convert_chunk,
+                        df[OUTPUT_COLUMNS[0]].to_numpy(dtype=float),
+                        df[OUTPUT_COLUMNS[2]].to_numpy(dtype=float),
+                        n_read,
+                        decimate,
+                        convert
+                    ))
+                    n_read += len(df)
+                    if len(futures) >= 2 * workers:
+                        writer.write(futures.popleft().result())
+            while futures:
+                writer.write(futures.popleft().result())
+    finally:
+        writer.close()
+    logger.info(
+        f"{n_read} readings read, {writer.n_rows} rows written to {output_file} in {perf_counter() - t0:.1f} s"
+    )
+    return writer.n_rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convert recorded data between CSV / TSV (DAT, TXT) / XLSX / BIN formats",
+        epilog=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("inputs", nargs="+", help="recorded files, several segments are concatenated in this order")
+    parser.add_argument("-o", "--output", required=True, help="output file, the format is chosen by the extension")
+    parser.add_argument("--decimate", type=int, default=1, help="keep every n-th reading")
+    parser.add_argument(
+        "--convert",
+        default=None,
+        help=f"\"module:function\" applied to the readings array, written to the \"{CONVERTED_COLUMN}\" column"
+    )
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="readings per chunk")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        format='%(asctime)s - %(name)6s - %(levelname)5s - %(message)s',
+        level=logging.INFO
+    )
+    try:
+        export(args.inputs, args.output, args.decimate, args.convert, args.workers, args.chunk_rows)
+    except (OSError, ValueError) as e:
+        logger.error(e)
+        sys.exit(1)
@@ -2,26 +2,30 @@ from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QLabel, \
     QPushButton, QHBoxLayout, QVBoxLayout, QSpinBox
 from PyQt5.QtCore import pyqtSignal, pyqtSlot, Qt, QThread, QMetaObject, Q_ARG, QEvent
 
-from widgets.pg_widgets import GraphWidget
+from widgets.pg_widgets import GraphWidget, SpectrumWidget
 from widgets.detachable_widgets import DetachableTabWidget
 from widgets.debug_widgets import CommunicationWidget, LoggerWidget
 from widgets.output_widget import OutputWidget
+from widgets.recording_widget import RecordingWidget
+from widgets.profiler_widget import ProfilerWidget
 
 import sys
 import logging
+import argparse
 from pathlib import Path
 
 from multimeter.multimeter_qapi import MultimeterQObject
+from multimeter.spectrum import WelchSpectrum
+from multimeter.replay import RecordingPlayer
+from multimeter.profiler import PROFILER
+from multimeter.convert import convert
 
 
 BASE_DIR = Path(__file__).absolute().parent
 LOG_PATH = BASE_DIR/"logs"
 STYLESHEET_PATH = BASE_DIR/"settings"/"style.css"
-
-
-def convert(value):
-    """Function that converts volts to temperature."""
-    return value * 2
+LIMITS_PATH = BASE_DIR/"settings"/"limits.json"
+SEQUENCES_PATH = BASE_DIR/"settings"/"sequences"
 
 
 class MainWindow(QMainWindow):
@@ -29,19 +33,26 @@ class MainWindow(QMainWindow):
     The main window
     """
 
-    def __init__(self):
+    def __init__(self, stream_port=None):
         super().__init__()
+        self.logger = logging.getLogger("Main")
 
         # tab widgets
         self.tab_widget = DetachableTabWidget()
         self.trend_widget = GraphWidget()
         self.trend_widget.plot.add_curve("Reading", "#ff7")
         self.trend_widget.plot.add_curve("Converted", "#cfc")
-        self.com_widget = CommunicationWidget()
+        self.spectrum_widget = SpectrumWidget()
+        self.recording_widget = RecordingWidget(directory=str(LOG_PATH))
+        self.profiler_widget = ProfilerWidget(snapshot_directory=str(LOG_PATH))
+        self.com_widget = CommunicationWidget(sequence_directory=str(SEQUENCES_PATH))
         self.logger_widget = LoggerWidget()
         self.tab_widget.addTab(self.trend_widget, "Trend")
+        self.tab_widget.addTab(self.spectrum_widget, "Spectrum")
+        self.tab_widget.addTab(self.recording_widget, "Recording")
         self.tab_widget.addTab(self.com_widget, "Communication")
         self.tab_widget.addTab(self.logger_widget, "Logs")
+        self.tab_widget.addTab(self.profiler_widget, "Profiler")
 
         # output widget
         self.output_widget = OutputWidget(default_filename=str(LOG_PATH/"output.xlsx"))
@@ -58,11 +69,15 @@ class MainWindow(QMainWindow):
         self.reading_text_label = QLabel("Last reading:")
         self.reading_text_label.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
         self.reading_value_label = QLabel("---")
+        self.alarm_label = QLabel("")
+        self.alarm_label.setObjectName("Alarm")
+        self.active_alarms = {}
         self.polling_layout = QHBoxLayout()
         self.polling_layout.addWidget(self.polling_label)
         self.polling_layout.addWidget(self.polling_timer_box)
         self.polling_layout.addWidget(self.reading_text_label)
         self.polling_layout.addWidget(self.reading_value_label)
+        self.polling_layout.addWidget(self.alarm_label)
         self.polling_layout.addWidget(self.start_stop_btn)
 
         # central layout
@@ -79,29 +94,79 @@ class MainWindow(QMainWindow):
 
         # device thread
         self.api_thread = QThread()
-        self.api_worker = MultimeterQObject()
+        self.api_thread.setObjectName("Acquisition")
+        self.api_worker = MultimeterQObject(limits_file=LIMITS_PATH)
         self.api_worker.moveToThread(self.api_thread)
+
+        # spectrum thread
+        self.spectrum_thread = QThread()
+        self.spectrum_thread.setObjectName("Spectrum")
+        self.spectrum_worker = WelchSpectrum()
+        self.spectrum_worker.moveToThread(self.spectrum_thread)
+
+        # replay thread, recorded readings take the same path as the live ones
+        self.replay_thread = QThread()
+        self.replay_thread.setObjectName("Replay")
+        self.replay_player = RecordingPlayer()
+        self.replay_player.moveToThread(self.replay_thread)
    
         # connections
         self.api_worker.SIG_UPDATE_PLOTS.connect(self.on_update_plots_sig)
         self.api_worker.SIG_RAW_CMD_REPLY.connect(self.com_widget.on_reply_received)
+        self.api_worker.SIG_ALARM.connect(self.on_alarm_sig)
+        self.api_worker.SIG_UPDATE_PLOTS.connect(self.spectrum_worker.add_readings)
+        self.spectrum_worker.SIG_SPECTRUM.connect(self.spectrum_widget.on_spectrum)
+        self.spectrum_worker.SIG_SEGMENTS_SKIPPED.connect(self.spectrum_widget.on_segments_skipped)
+        self.spectrum_widget.SIG_RESET.connect(self.spectrum_worker.reset)
+        self.spectrum_widget.SIG_SET_SEGMENT_LENGTH.connect(self.spectrum_worker.set_segment_length)
+        self.replay_player.SIG_UPDATE_PLOTS.connect(self.on_update_plots_sig)
+        self.replay_player.SIG_UPDATE_PLOTS.connect(self.spectrum_worker.add_readings)
+        self.replay_player.SIG_FINISHED.connect(self.recording_widget.on_replay_finished)
+        self.replay_player.SIG_FINISHED.connect(self.on_replay_finished)
+        self.recording_widget.SIG_OPEN.connect(self.replay_player.open_recording)
+        self.replay_player.SIG_PROGRESS.connect(self.recording_widget.on_open_progress)
+        self.replay_player.SIG_OPENED.connect(self.recording_widget.on_recording_opened)
+        self.recording_widget.SIG_REPLAY.connect(self.on_replay_started)
+        self.recording_widget.SIG_REPLAY.connect(self.replay_player.play)
+        self.recording_widget.SIG_STOP_REPLAY.connect(self.replay_player.stop)
         self.com_widget.SIG_RAW_CMD_SEND.connect(self.api_worker.send_raw_cmd)
+        self.com_widget.SIG_RUN_SEQUENCE.connect(self.api_worker.run_sequence)
+        self.com_widget.SIG_STOP_SEQUENCE.connect(self.api_worker.stop_sequence)
+        self.api_worker.SIG_SEQUENCE_FINISHED.connect(self.com_widget.on_sequence_finished)
         self.start_stop_btn.clicked.connect(self.on_start_stop_pressed)
         self.polling_timer_box.valueChanged.connect(self.on_polling_changed)
         self.output_widget.SIG_SET_FILENAME.connect(self.api_worker.set_filename)
         self.output_widget.SIG_ENABLE_WRITING.connect(self.api_worker.enable_writing)
         self.api_thread.started.connect(self.output_widget.post_init)
 
-        # start the thread
+        # start the threads
         QMetaObject.invokeMethod(self.api_thread, 'start', Qt.QueuedConnection)
+        QMetaObject.invokeMethod(self.spectrum_thread, 'start', Qt.QueuedConnection)
+        QMetaObject.invokeMethod(self.replay_thread, 'start', Qt.QueuedConnection)
+
+        # optional live stream for external consumers
+        if stream_port is not None:
+            QMetaObject.invokeMethod(
+                self.api_worker,
+                'enable_streaming',
+                Qt.QueuedConnection,
+                Q_ARG(bool, True),
+                Q_ARG(int, stream_port)
+            )
 
         # status
         self.is_polling = False
+        self.resume_polling_after_replay = False
+        self.is_showing_replay = False
 
     @pyqtSlot()
     def on_start_stop_pressed(self):
         self.is_polling = not self.is_polling
         if self.is_polling:
+            if self.is_showing_replay:
+                # replayed readings stay in the views until live polling starts again
+                self.is_showing_replay = False
+                self.clear_live_views()
             self.start_stop_btn.setText(u"\U0001F7E5 Stop")
         else:
             self.start_stop_btn.setText(u"\U0001F7E2 Start")
@@ -117,12 +182,55 @@ class MainWindow(QMainWindow):
             Q_ARG(int,  self.polling_timer_box.value())
         )
 
-    @pyqtSlot(float, float)
-    def on_update_plots_sig(self, timestamp, value):
-        self.trend_widget.plot.update_ups(timestamp)
-        self.trend_widget.plot.add_curve_data({"Reading": [timestamp, value]})
-        self.trend_widget.plot.add_curve_data({"Converted": [timestamp, convert(value)]})
-        self.reading_value_label.setText(f"{value:.6g}")
+    @pyqtSlot(object, float)
+    def on_replay_started(self, recording, speed):
+        # live and recorded readings must not be mixed in one trend and spectrum
+        if self.is_polling:
+            self.logger.warning("Polling is paused during the replay")
+            self.resume_polling_after_replay = True
+            self.on_start_stop_pressed()
+        self.start_stop_btn.setEnabled(False)
+        self.clear_live_views()
+        self.is_showing_replay = True
+
+    @pyqtSlot()
+    def on_replay_finished(self):
+        self.start_stop_btn.setEnabled(True)
+        if self.resume_polling_after_replay:
+            self.resume_polling_after_replay = False
+            self.logger.info("Polling resumed after the replay")
+            self.on_start_stop_pressed()
+
+    def clear_live_views(self):
+        self.trend_widget.plot.clear_all_curves()
+        self.spectrum_widget.clear()
+        QMetaObject.invokeMethod(self.spectrum_worker, 'reset', Qt.QueuedConnection)
+
+    @pyqtSlot(object, object)
+    def on_update_plots_sig(self, timestamps, values):
+        timestamps_list = timestamps.tolist()
+        self.trend_widget.plot.update_ups(timestamps_list[-1])
+        self.trend_widget.plot.add_curve_data({
+            "Reading": [timestamps_list, values.tolist()],
+            "Converted": [timestamps_list, convert(values).tolist()]
+        })
+        self.reading_value_label.setText(f"{values[-1]:.6g}")
+
+    @pyqtSlot(str, str, bool)
+    def on_alarm_sig(self, name, msg, raised):
+        # the label stays while any rule is in alarm, it shows the latest alarm
+        self.active_alarms.pop(name, None)
+        if raised:
+            self.active_alarms[name] = msg
+        if self.active_alarms:
+            text = u"\u26A0 " + list(self.active_alarms.values())[-1]
+            if len(self.active_alarms) > 1:
+                text += f" (+{len(self.active_alarms) - 1})"
+            self.alarm_label.setText(text)
+            self.alarm_label.setToolTip("\n".join(self.active_alarms.values()))
+        else:
+            self.alarm_label.setText("")
+            self.alarm_label.setToolTip("")
 
     @staticmethod
     def read_style_sheet(filename):
@@ -137,20 +245,43 @@ class MainWindow(QMainWindow):
         self.api_worker.stop()
         self.api_worker.disconnect()
 
+        # stop spectrum and replay threads
+        QMetaObject.invokeMethod(self.replay_player, 'stop', Qt.QueuedConnection)
+        for thread in (self.spectrum_thread, self.replay_thread):
+            thread.quit()
+            thread.wait()
+
         # close detached tabs in tabwidgets
         for w in self.tab_widget.widgets_by_id.values():
             w.deleteLater()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keysight/Agilent 34410A Multimeter GUI")
+    parser.add_argument(
+        "--stream-port",
+        type=int,
+        default=None,
+        help="publish live readings to local TCP subscribers on this port (e.g. 5555)"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="enable per-stage timing from the start (see the Profiler tab)"
+    )
+    args, qt_args = parser.parse_known_args()
+
     logging.basicConfig(
         format='%(asctime)s - %(name)6s - %(levelname)5s - %(message)s',
         level=logging.DEBUG
         #level=logging.INFO
     )
 
-    app = QApplication(sys.argv)
-    mw = MainWindow()
+    if args.profile:
+        PROFILER.enable()
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    mw = MainWindow(stream_port=args.stream_port)
     mw.setWindowTitle("Mutilmeter control")
     mw.setGeometry(50, 50, 800, 600)
     mw.show()
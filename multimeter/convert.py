@@ -0,0 +1,9 @@
+"""
+Conversion of the readings, shared by the GUI and export.py.
+Keep this module free of Qt imports, it is imported by every export worker process.
+"""
+
+
+def convert(value):
+    """Function that converts volts to temperature."""
+    return value * 2
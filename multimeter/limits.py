@@ -0,0 +1,188 @@
+import json
+import logging
+from time import perf_counter
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# the 34410A returns +/-9.9E+37 for an overload
+OVERLOAD_VALUE = 9.9e37
+
+
+class LimitRule:
+    """
+        Base class for limit rules.
+        violations() gets a whole batch of readings and returns a boolean mask, no per-sample Python code.
+        An active alarm is cleared only after the readings have satisfied the rule for hold_off_s.
+    """
+
+    def __init__(self, name, action=None, enabled=True, hold_off_s=1.0):
+        self.name = name
+        self.action = action
+        self.enabled = enabled
+        self.hold_off_s = hold_off_s
+        self.is_active = False
+        self.last_violation_ts = None
+
+    def violations(self, ts, values):
+        raise NotImplementedError
+
+    def describe(self, ts, value):
+        return f"{self.name}: {value:.6g}"
+
+
+class ThresholdRule(LimitRule):
+    def __init__(self, name, low=None, high=None, **kwargs):
+        super().__init__(name, **kwargs)
+        self.low = -np.inf if low is None else low
+        self.high = np.inf if high is None else high
+
+    def violations(self, ts, values):
+        return (values < self.low) | (values > self.high)
+
+    def describe(self, ts, value):
+        return f"{self.name}: {value:.6g} is out of [{self.low:.6g}, {self.high:.6g}]"
+
+
+class RateRule(LimitRule):
+    """Rate of change between consecutive readings, in units per second"""
+
+    def __init__(self, name, max_rate, **kwargs):
+        super().__init__(name, **kwargs)
+        self.max_rate = max_rate
+        self.last_ts = None
+        self.last_value = None
+
+    def violations(self, ts, values):
+        if self.last_ts is None:
+            prev_ts = np.concatenate(([ts[0]], ts[:-1]))
+            prev_values = np.concatenate(([values[0]], values[:-1]))
+        else:
+            prev_ts = np.concatenate(([self.last_ts], ts[:-1]))
+            prev_values = np.concatenate(([self.last_value], values[:-1]))
+        self.last_ts, self.last_value = ts[-1], values[-1]
+        dt = ts - prev_ts
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = np.abs(values - prev_values) / dt
+        return (dt > 0) & (rate > self.max_rate)
+
+    def describe(self, ts, value):
+        return f"{self.name}: rate of change exceeds {self.max_rate:.6g}/s at {value:.6g}"
+
+
+class DeviationRule(LimitRule):
+    """Deviation of a reading from the mean of the last `window` readings (including itself)"""
+
+    def __init__(self, name, window, max_deviation, **kwargs):
+        super().__init__(name, **kwargs)
+        self.window = int(window)
+        self.max_deviation = max_deviation
+        self.history = np.empty(0)
+
+    def violations(self, ts, values):
+        data = np.concatenate((self.history, values))
+        self.history = data[-(self.window - 1):] if self.window > 1 else np.empty(0)
+        # overloads and NaNs are violations themselves and are left out of the means
+        invalid = ~np.isfinite(data) | (np.abs(data) >= OVERLOAD_VALUE)
+        mask = invalid[-len(values):].copy()
+        if len(data) < self.window:
+            return mask
+        # every window is summed separately, a huge reading can't spoil the precision of later means
+        sums = sliding_window_view(np.where(invalid, 0.0, data), self.window).sum(axis=1)
+        counts = sliding_window_view(~invalid, self.window).sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            deviation = np.abs(data[self.window - 1:] - sums / counts)
+        mask[len(mask) - len(deviation):] |= deviation[-len(mask):] > self.max_deviation
+        return mask
+
+    def describe(self, ts, value):
+        return f"{self.name}: {value:.6g} deviates more than {self.max_deviation:.6g} " \
+               f"from the mean of {self.window} readings"
+
+
+RULE_TYPES = {
+    "threshold": ThresholdRule,
+    "rate": RateRule,
+    "deviation": DeviationRule,
+}
+
+
+class LimitEngine:
+    """
+        Evaluates all rules on batches of readings.
+        An alarm is raised once when a rule becomes violated and cleared when it has been satisfied for its hold-off,
+        so every rule produces at most one raise and one clear per batch.
+    """
+
+    def __init__(self, rules=None):
+        self.rules = rules or []
+        self.n_evaluations = 0
+        self.n_samples = 0
+        self.total_time_s = 0.0
+        self.last_time_s = 0.0
+
+    @classmethod
+    def from_file(cls, filename):
+        with open(str(filename), "r") as file:
+            config = json.load(file)
+        rules = []
+        for rule_config in config.get("rules", []):
+            rule_config = dict(rule_config)
+            rule_type = rule_config.pop("type")
+            if rule_type not in RULE_TYPES:
+                raise ValueError(f"Unknown limit rule type: {rule_type}")
+            rules.append(RULE_TYPES[rule_type](**rule_config))
+        return cls(rules)
+
+    def evaluate(self, ts, values):
+        """
+        Returns a list of (rule, raised, ts, value) events, raised is False when an alarm is cleared
+        """
+        t0 = perf_counter()
+        ts = np.asarray(ts, dtype=float)
+        values = np.asarray(values, dtype=float)
+        events = []
+        for rule in self.rules:
+            if not rule.enabled:
+                continue
+            mask = rule.violations(ts, values)
+            violated = np.flatnonzero(mask)
+            if len(violated):
+                rule.last_violation_ts = ts[violated[-1]]
+                if not rule.is_active:
+                    # the first violation of the batch raises the alarm
+                    rule.is_active = True
+                    events.append((rule, True, ts[violated[0]], values[violated[0]]))
+            if rule.is_active and not mask[-1] and ts[-1] - rule.last_violation_ts >= rule.hold_off_s:
+                rule.is_active = False
+                events.append((rule, False, ts[-1], values[-1]))
+        self.last_time_s = perf_counter() - t0
+        self.total_time_s += self.last_time_s
+        self.n_evaluations += 1
+        self.n_samples += len(values)
+        return events
+
+    def metrics(self):
+        return {
+            "limit_evaluations": self.n_evaluations,
+            "limit_samples": self.n_samples,
+            "limit_total_time_s": self.total_time_s,
+            "limit_last_time_s": self.last_time_s,
+            "limit_time_per_sample_us": 1e6 * self.total_time_s / self.n_samples if self.n_samples else 0.0,
+        }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    engine = LimitEngine([
+        ThresholdRule("Overrange", high=1.0),
+        RateRule("Jump", max_rate=50.0),
+        DeviationRule("Spike", window=100, max_deviation=0.5),
+    ])
+    t = np.arange(100000) * 1e-3
+    v = np.sin(t)
+    v[50000] += 2
+    for k in range(0, len(t), 1000):
+        for rule, raised, ts, value in engine.evaluate(t[k:k + 1000], v[k:k + 1000]):
+            logging.info(f"ALARM {rule.describe(ts, value)}" if raised else f"CLEARED {rule.name}")
+    logging.info(engine.metrics())
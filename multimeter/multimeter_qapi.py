@@ -1,9 +1,13 @@
-from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, Qt, QTimer, QMetaObject
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, Qt, QTimer, QMetaObject, Q_ARG
 import logging
-from datetime import datetime
-from time import time
-from random import random
 from multimeter.visa_interface import VISAInterface, INSTRUMENT_ADDRESS
+from multimeter.stream_server import StreamServer
+from multimeter.limits import LimitEngine
+from multimeter.recording import OUTPUT_COLUMNS, format_datetime
+from multimeter.timebase import SessionClock
+from multimeter.profiler import PROFILER
+from multimeter.sequence import SequenceRunner
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
@@ -12,12 +16,22 @@ class MultimeterQObject(QObject):
     """
         Qt wrapper for Multimeter
     """
-    SIG_UPDATE_PLOTS = pyqtSignal(float, float)
+    # batch of readings: timestamps and values arrays
+    SIG_UPDATE_PLOTS = pyqtSignal(object, object)
     SIG_RAW_CMD_REPLY = pyqtSignal(str)
+    SIG_ALARM = pyqtSignal(str, str, bool)  # rule name, message, raised
+    SIG_SEQUENCE_FINISHED = pyqtSignal(object)
 
-    def __init__(self):
+    def __init__(self, limits_file=None):
         super().__init__()
         self.logger = logging.getLogger("Multimeter")
+        self.limit_engine = LimitEngine()
+        if limits_file is not None and Path(limits_file).is_file():
+            try:
+                self.limit_engine = LimitEngine.from_file(limits_file)
+                self.logger.info(f"{len(self.limit_engine.rules)} limit rules loaded from {limits_file}")
+            except Exception as e:
+                self.logger.error(f"Could not load limit rules from {limits_file}: {e}")
         try:
             self.interface = VISAInterface(
                 address=INSTRUMENT_ADDRESS,
@@ -36,10 +50,21 @@ class MultimeterQObject(QObject):
         self.polling_period_ms = 1000
         self.is_writing_enabled = True
         self.filename = "output.csv"
+        self.stream_server = None
+        self.clock = SessionClock()
+        # None: not known yet, 0: readings are not timer-paced
+        self.sample_interval_s = None
+        self.sequence_runner = SequenceRunner(self.interface, parent=self)
+        self.sequence_runner.SIG_FINISHED.connect(self.on_sequence_finished)
+        self.resume_polling_after_sequence = False
 
     @pyqtSlot(bool, int)
     def enable_polling(self, enable=False, period=1000):
         self.polling_period_ms = period
+        if self.sequence_runner.is_running:
+            # applied when the sequence has finished
+            self.resume_polling_after_sequence = enable
+            return
         if enable:
             self.start_polling_timer()
         else:
@@ -49,26 +74,69 @@ class MultimeterQObject(QObject):
     def start_polling_timer(self):
         if self.polling_timer.isActive():
             self.polling_timer.stop()
+        else:
+            # a new polling session gets a new wall-clock anchor
+            self.clock = SessionClock()
         self.polling_timer.start(self.polling_period_ms)
 
     @pyqtSlot()
     def stop_polling_timer(self):
         if self.polling_timer.isActive():
             self.polling_timer.stop()
+            if self.limit_engine.n_evaluations:
+                self.logger.info(f"Limit engine metrics: {self.limit_engine.metrics()}")
+            self.logger.debug(f"Wall clock drift since the session start: {self.clock.drift_s() * 1e3:.3f} ms")
 
     @pyqtSlot()
     def get_value(self):
         """Read real values from the device."""
         if self.interface is not None:
-            ts = time()
-            value = float(self.interface.talk("READ?"))
-            self.SIG_UPDATE_PLOTS.emit(ts, value)
+            start_ns = self.clock.now_ns()
+            reply = self.interface.talk("READ?")
+            stop_ns = self.clock.now_ns()
+            # several comma separated readings if the sample count (SAMP:COUN) is > 1
+            values = np.array(reply.split(","), dtype=float)
+            interval_s = self.get_sample_interval() if len(values) > 1 else None
+            timestamps = self.clock.sample_times(start_ns, stop_ns, len(values), interval_s)
+            self.SIG_UPDATE_PLOTS.emit(timestamps, values)
+            if self.stream_server is not None:
+                self.stream_server.add_readings(timestamps, values)
+            if any(rule.enabled for rule in self.limit_engine.rules):
+                self.check_limits(timestamps, values)
             if self.is_writing_enabled:
-                self.write_data_to_file(ts, value)
-        # ts = time()
-        # value = random()
-        # self.SIG_UPDATE_PLOTS.emit(ts, value)
-        
+                with PROFILER.stage("write_data_to_file"):
+                    self.write_data_to_file(timestamps, values)
+
+    def get_sample_interval(self):
+        """Interval between buffered readings, queried once after every configuration change"""
+        if self.sample_interval_s is None:
+            try:
+                if self.interface.talk("SAMP:SOUR?").upper().startswith("TIM"):
+                    self.sample_interval_s = float(self.interface.talk("SAMP:TIM?"))
+                else:
+                    self.sample_interval_s = 0
+            except Exception as e:
+                self.logger.error(e, exc_info=True)
+                self.sample_interval_s = 0
+        return self.sample_interval_s or None
+
+    def check_limits(self, timestamps, values):
+        with PROFILER.stage("LimitEngine.evaluate"):
+            events = self.limit_engine.evaluate(timestamps, values)
+        for rule, raised, ts, value in events:
+            if raised:
+                msg = f"ALARM {rule.describe(ts, value)}"
+                self.logger.warning(msg)
+                if rule.action and self.interface is not None:
+                    self.logger.info(f"ALARM ACTION: {rule.action}")
+                    try:
+                        self.interface.write(rule.action)
+                    except Exception as e:
+                        self.logger.error(e, exc_info=True)
+            else:
+                msg = f"CLEARED {rule.name}"
+                self.logger.info(msg)
+            self.SIG_ALARM.emit(rule.name, msg, raised)
 
     @pyqtSlot(str)
     def send_raw_cmd(self, cmd_str):
@@ -81,15 +149,57 @@ class MultimeterQObject(QObject):
                     self.SIG_RAW_CMD_REPLY.emit(str(reply))
                 else:
                     self.interface.write(cmd_str)
+                    # the command may have changed the sampling
+                    self.sample_interval_s = None
             except Exception as e:
                 self.logger.error(e, exc_info=True)
         else:
             # Normally this code should never be executed, it is here just for debug purposes
             self.logger.warning(f"Command {cmd_str} was ignored. Please, connect to the device first!")
     
+    @pyqtSlot(str)
+    def run_sequence(self, text):
+        if self.interface is None:
+            self.logger.warning("Sequence was ignored. Please, connect to the device first!")
+            self.SIG_SEQUENCE_FINISHED.emit({})
+            return
+        if self.sequence_runner.is_running:
+            self.logger.warning("A sequence is already running")
+            return
+        # polling would interleave READ? with the sequence
+        self.resume_polling_after_sequence = self.polling_timer.isActive()
+        self.stop_polling_timer()
+        self.sequence_runner.run(text)
+
+    @pyqtSlot()
+    def stop_sequence(self):
+        self.sequence_runner.stop()
+
+    @pyqtSlot(object)
+    def on_sequence_finished(self, results):
+        # the sequence has probably changed the configuration
+        self.sample_interval_s = None
+        if self.resume_polling_after_sequence:
+            self.resume_polling_after_sequence = False
+            self.start_polling_timer()
+        self.SIG_SEQUENCE_FINISHED.emit(results)
+
+    @pyqtSlot(bool, int)
+    def enable_streaming(self, enable=False, port=0):
+        if self.stream_server is not None:
+            self.stream_server.close()
+            self.stream_server.deleteLater()
+            self.stream_server = None
+        if enable:
+            try:
+                self.stream_server = StreamServer(port=port, parent=self)
+            except ConnectionError as e:
+                self.logger.error(e)
+
     @pyqtSlot()
     def stop(self):
         QMetaObject.invokeMethod(self, 'stop_polling_timer', Qt.QueuedConnection)
+        QMetaObject.invokeMethod(self, 'enable_streaming', Qt.QueuedConnection, Q_ARG(bool, False), Q_ARG(int, 0))
         if self.interface is not None:
             self.interface.close()
 
@@ -103,14 +213,14 @@ class MultimeterQObject(QObject):
         self.is_writing_enabled = enable
         self.logger.info(f"Write to file: {enable}")
 
-    def write_data_to_file(self, ts, value):
+    def write_data_to_file(self, timestamps, values):
         try:
-            dt_milliseconds = datetime.fromtimestamp(ts).isoformat(sep=' ', timespec='milliseconds')
             file_exists = Path(self.filename).is_file()
-            df = pd.DataFrame(
-                    columns=["Timestamp", "Datetime", "Readings [V or Ohm]"],
-                    data=[[ts, dt_milliseconds, value]]
-                )
+            df = pd.DataFrame({
+                OUTPUT_COLUMNS[0]: timestamps,
+                OUTPUT_COLUMNS[1]: format_datetime(timestamps),
+                OUTPUT_COLUMNS[2]: values
+            })
 
             # CSV
             if self.filename.endswith(".csv"):
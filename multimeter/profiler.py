@@ -0,0 +1,144 @@
+import logging
+import sys
+import threading
+from collections import Counter, deque
+from contextlib import nullcontext
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter, sleep
+import numpy as np
+from PyQt5.QtCore import QThread
+
+
+class StageTimer:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.t0 = 0.0
+
+    def __enter__(self):
+        self.t0 = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.add_timing(self.name, perf_counter() - self.t0)
+        return False
+
+
+class StageProfiler:
+    """
+        Rolling timings of the main processing stages on all threads.
+        When profiling is disabled stage() returns a shared no-op context manager.
+    """
+    NULL_CONTEXT = nullcontext()
+
+    def __init__(self, history=1000):
+        self.logger = logging.getLogger("Profiler")
+        self.enabled = False
+        self.history = history
+        self.lock = threading.Lock()
+        self.timings = {}
+        self.threads_by_stage = {}
+        self.totals = Counter()
+        self.thread_names = {threading.main_thread().ident: "GUI"}
+        self.start_time = perf_counter()
+        self.sampler = None
+
+    def thread_name(self, ident=None):
+        if ident is None:
+            # Qt threads are not known to the threading module, their object name is used
+            ident = threading.get_ident()
+            if ident not in self.thread_names:
+                self.thread_names[ident] = QThread.currentThread().objectName() or f"Thread-{ident}"
+        return self.thread_names.get(ident, f"Thread-{ident}")
+
+    def enable(self, enable=True):
+        with self.lock:
+            self.enabled = enable
+            self.timings = {}
+            self.threads_by_stage = {}
+            self.totals = Counter()
+            self.start_time = perf_counter()
+        self.logger.info(f"Stage profiling {'enabled' if enable else 'disabled'}")
+
+    def stage(self, name):
+        if not self.enabled:
+            return self.NULL_CONTEXT
+        return StageTimer(self, name)
+
+    def add_timing(self, name, duration):
+        with self.lock:
+            if name not in self.timings:
+                self.timings[name] = deque(maxlen=self.history)
+                self.threads_by_stage[name] = self.thread_name()
+            self.timings[name].append(duration)
+            self.totals[name] += duration
+
+    def stats(self):
+        """Per-stage statistics of the last `history` calls, load is the share of wall time spent in the stage"""
+        with self.lock:
+            timings = {name: np.array(values) for name, values in self.timings.items()}
+            totals = dict(self.totals)
+            elapsed = perf_counter() - self.start_time
+        result = []
+        for name, values in timings.items():
+            if not len(values):
+                continue
+            result.append({
+                "stage": name,
+                "thread": self.threads_by_stage[name],
+                "calls": len(values),
+                "mean_ms": 1e3 * values.mean(),
+                "p95_ms": 1e3 * np.percentile(values, 95),
+                "max_ms": 1e3 * values.max(),
+                "load": totals[name] / elapsed if elapsed > 0 else 0.0,
+            })
+        return result
+
+    def take_snapshot(self, duration_s, directory, interval_s=0.001):
+        """
+        Samples the stacks of all threads for duration_s in a background thread and saves them
+        in the collapsed stack format (one "frame;frame;frame count" line per stack, flamegraph compatible)
+        """
+        if self.sampler is not None and self.sampler.is_alive():
+            self.logger.warning("A profiling snapshot is already running")
+            return
+        filename = Path(directory) / f"profile_{datetime.now():%Y%m%d_%H%M%S}.txt"
+        self.sampler = threading.Thread(
+            target=self.sample_stacks,
+            args=(duration_s, filename, interval_s),
+            name="Profiler",
+            daemon=True
+        )
+        self.sampler.start()
+
+    def sample_stacks(self, duration_s, filename, interval_s):
+        self.logger.info(f"Sampling all threads for {duration_s:g} s")
+        own_ident = threading.get_ident()
+        stacks = Counter()
+        n_samples = 0
+        t_stop = perf_counter() + duration_s
+        while perf_counter() < t_stop:
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                    frame = frame.f_back
+                names.append(self.thread_name(ident))
+                stacks[";".join(reversed(names))] += 1
+            n_samples += 1
+            sleep(interval_s)
+        try:
+            Path(filename).parent.mkdir(parents=True, exist_ok=True)
+            with open(filename, "w") as file:
+                for stack, count in stacks.most_common():
+                    file.write(f"{stack} {count}\n")
+            self.logger.info(f"Profiling snapshot ({n_samples} samples) saved to {filename}")
+        except OSError as e:
+            self.logger.error(f"Could not save profiling snapshot: {e}")
+
+
+PROFILER = StageProfiler()
@@ -0,0 +1,167 @@
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+
+# column schema of the files written by MultimeterQObject.write_data_to_file
+OUTPUT_COLUMNS = ["Timestamp", "Datetime", "Readings [V or Ohm]"]
+# binary format: little-endian float64 (timestamp, reading) pairs, also used as the index of text recordings
+RECORD_DTYPE = np.dtype([("ts", "<f8"), ("value", "<f8")])
+BINARY_SUFFIX = ".bin"
+INDEX_SUFFIX = ".idx" + BINARY_SUFFIX
+CHUNK_ROWS = 200000
+# up to this many rows format_datetime formats every timestamp separately
+SMALL_BATCH_ROWS = 64
+# a plotted window reads at most this many samples per output point, longer windows are strided first
+WINDOW_OVERSAMPLING = 16
+
+logger = logging.getLogger("Recording")
+
+
+def read_chunks(filename, chunk_rows=CHUNK_ROWS, usecols=None):
+    """
+    Reads a recording chunk by chunk, yields DataFrames with OUTPUT_COLUMNS
+    (only the Timestamp and Readings columns if usecols="numeric")
+    """
+    filename = str(filename)
+    if usecols == "numeric":
+        usecols = [OUTPUT_COLUMNS[0], OUTPUT_COLUMNS[2]]
+    if filename.endswith(BINARY_SUFFIX):
+        data = np.memmap(filename, dtype=RECORD_DTYPE, mode="r") if os.path.getsize(filename) else []
+        for start in range(0, len(data), chunk_rows):
+            chunk = data[start:start + chunk_rows]
+            df = pd.DataFrame({OUTPUT_COLUMNS[0]: chunk["ts"], OUTPUT_COLUMNS[2]: chunk["value"]})
+            if usecols is None:
+                df.insert(1, OUTPUT_COLUMNS[1], format_datetime(df[OUTPUT_COLUMNS[0]].to_numpy()))
+            yield df
+    elif filename.endswith(".csv"):
+        yield from pd.read_csv(filename, usecols=usecols, chunksize=chunk_rows)
+    elif filename.endswith(".dat") or filename.endswith(".txt"):
+        yield from pd.read_csv(filename, sep="\t", usecols=usecols, chunksize=chunk_rows)
+    elif filename.endswith(".xlsx"):
+        # openpyxl can't read parts of a sheet, the whole file is loaded once
+        df = pd.read_excel(filename, usecols=usecols)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+    else:
+        raise ValueError(f"Unsupported recording format: {filename}")
+
+
+def format_datetime(timestamps):
+    """Vectorized equivalent of datetime.fromtimestamp(ts).isoformat(sep=' ', timespec='milliseconds')"""
+    if len(timestamps) <= SMALL_BATCH_ROWS:
+        # the pandas setup costs more than a few fromtimestamp calls, e.g. for every poll of 1 reading
+        return [
+            datetime.fromtimestamp(ts).isoformat(sep=' ', timespec='milliseconds')
+            for ts in np.asarray(timestamps).tolist()
+        ]
+    dt = pd.to_datetime(timestamps, unit="s", utc=True).tz_convert(None).round("us") + get_utc_offset(timestamps)
+    return dt.strftime("%Y-%m-%d %H:%M:%S.%f").str[:-3]
+
+
+def get_utc_offset(timestamps):
+    # local time offset of the first sample, a DST switch inside one chunk is ignored
+    if len(timestamps) == 0:
+        return pd.Timedelta(0)
+    return pd.Timedelta(datetime.fromtimestamp(float(timestamps[0])).astimezone().utcoffset())
+
+
+def build_index(filename, progress=None):
+    """
+    Converts a text recording to the binary format once, the index is rebuilt only when the recording is newer.
+    progress(filename, n_readings) is called after every indexed chunk. Returns the path of the binary file.
+    """
+    filename = Path(filename)
+    if filename.name.endswith(BINARY_SUFFIX):
+        return filename
+    index_filename = filename.with_name(filename.name + INDEX_SUFFIX)
+    if index_filename.is_file() and index_filename.stat().st_mtime >= filename.stat().st_mtime:
+        return index_filename
+    logger.info(f"Indexing {filename}")
+    tmp_filename = index_filename.with_name(index_filename.name + ".tmp")
+    n_readings = 0
+    with open(tmp_filename, "wb") as file:
+        for df in read_chunks(filename, usecols="numeric"):
+            records = np.empty(len(df), dtype=RECORD_DTYPE)
+            records["ts"] = df[OUTPUT_COLUMNS[0]].to_numpy(dtype=float)
+            records["value"] = df[OUTPUT_COLUMNS[2]].to_numpy(dtype=float)
+            records.tofile(file)
+            n_readings += len(df)
+            if progress is not None:
+                progress(filename, n_readings)
+    os.replace(tmp_filename, index_filename)
+    return index_filename
+
+
+def decimate(ts, values, max_points):
+    """
+    Min/max decimation: every bin is represented by its smallest and largest reading, so spikes stay visible
+    """
+    if len(ts) <= max_points:
+        return ts, values
+    n_bins = max(max_points // 2, 1)
+    bin_size = -(-len(ts) // n_bins)
+    n_full = len(ts) // bin_size * bin_size
+    bins = values[:n_full].reshape(-1, bin_size)
+    offsets = np.arange(0, n_full, bin_size)
+    i_min = offsets + np.argmin(bins, axis=1)
+    i_max = offsets + np.argmax(bins, axis=1)
+    indexes = np.sort(np.concatenate((i_min, i_max)))
+    if n_full < len(ts):
+        indexes = np.append(indexes, [n_full + np.argmin(values[n_full:]), n_full + np.argmax(values[n_full:])])
+        indexes = np.sort(indexes)
+    return ts[indexes], values[indexes]
+
+
+class Recording:
+    """
+        One or several recorded segments, memory-mapped from their binary index.
+        Opening a text recording for the first time indexes it, which takes a while for large files.
+    """
+
+    def __init__(self, filenames, progress=None):
+        self.filenames = [str(f) for f in filenames]
+        self.segments = []
+        for filename in self.filenames:
+            index_filename = build_index(filename, progress)
+            if os.path.getsize(index_filename) == 0:
+                continue
+            self.segments.append(np.memmap(index_filename, dtype=RECORD_DTYPE, mode="r"))
+        self.segments.sort(key=lambda segment: segment["ts"][0])
+
+    def __len__(self):
+        return sum(len(segment) for segment in self.segments)
+
+    @property
+    def start(self):
+        return self.segments[0]["ts"][0] if self.segments else 0.0
+
+    @property
+    def end(self):
+        return self.segments[-1]["ts"][-1] if self.segments else 0.0
+
+    def ranges(self, t_start, t_stop):
+        """(segment, first index, stop index) for every segment overlapping t_start <= ts < t_stop"""
+        for segment in self.segments:
+            if segment["ts"][-1] < t_start or segment["ts"][0] >= t_stop:
+                continue
+            i_start = np.searchsorted(segment["ts"], t_start, side="left")
+            i_stop = np.searchsorted(segment["ts"], t_stop, side="left")
+            yield segment, i_start, i_stop
+
+    def samples(self, t_start, t_stop, step=1):
+        """All samples with t_start <= ts < t_stop (every step-th one), only this part of the files is read"""
+        parts = [np.array(segment[i_start:i_stop:step]) for segment, i_start, i_stop in self.ranges(t_start, t_stop)]
+        if not parts:
+            return np.empty(0), np.empty(0)
+        records = np.concatenate(parts)
+        return records["ts"], records["value"]
+
+    def window(self, t_start, t_stop, max_points=5000):
+        """Samples of the visible time window decimated for plotting"""
+        n_samples = sum(i_stop - i_start for _, i_start, i_stop in self.ranges(t_start, t_stop))
+        step = max(n_samples // (max_points * WINDOW_OVERSAMPLING), 1)
+        return decimate(*self.samples(t_start, t_stop, step), max_points)
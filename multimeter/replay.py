@@ -0,0 +1,76 @@
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, Qt, QTimer
+import logging
+from pathlib import Path
+from time import perf_counter
+from multimeter.recording import Recording
+
+
+class RecordingPlayer(QObject):
+    """
+        Replays a Recording at N x speed with the same signal as MultimeterQObject,
+        so the plots get real data at a controlled rate.
+        Recordings are also opened (and indexed) here to keep the GUI thread responsive.
+    """
+    SIG_UPDATE_PLOTS = pyqtSignal(object, object)
+    SIG_FINISHED = pyqtSignal()
+    SIG_OPENED = pyqtSignal(object)  # Recording or None if it could not be opened
+    SIG_PROGRESS = pyqtSignal(str)
+
+    def __init__(self, tick_ms=20):
+        super().__init__()
+        self.logger = logging.getLogger("Replay")
+        self.tick_ms = tick_ms
+        self.recording = None
+        self.speed = 1.0
+        self.position = 0.0
+        self.wall_start = 0.0
+        self.position_start = 0.0
+        self.n_emitted = 0
+        self.timer = None
+
+    @pyqtSlot(object)
+    def open_recording(self, filenames):
+        def progress(filename, n_readings):
+            self.SIG_PROGRESS.emit(f"Indexing {Path(filename).name}: {n_readings} readings")
+
+        recording = None
+        try:
+            recording = Recording(filenames, progress)
+        except Exception as e:
+            self.logger.error(e, exc_info=True)
+        self.SIG_OPENED.emit(recording)
+
+    @pyqtSlot(object, float)
+    def play(self, recording, speed=1.0):
+        if self.timer is None:
+            # created here to live in the player's thread
+            self.timer = QTimer(self)
+            self.timer.setTimerType(Qt.PreciseTimer)
+            self.timer.timeout.connect(self.on_tick)
+        self.recording = recording
+        self.speed = speed
+        self.position = recording.start
+        self.position_start = recording.start
+        self.wall_start = perf_counter()
+        self.n_emitted = 0
+        self.logger.info(f"Replay of {len(recording)} readings at {speed:g}x started")
+        self.timer.start(self.tick_ms)
+
+    @pyqtSlot()
+    def stop(self):
+        if self.timer is not None and self.timer.isActive():
+            self.timer.stop()
+            elapsed = perf_counter() - self.wall_start
+            self.logger.info(f"Replay stopped, {self.n_emitted} readings in {elapsed:.1f} s")
+            self.SIG_FINISHED.emit()
+
+    @pyqtSlot()
+    def on_tick(self):
+        target = self.position_start + (perf_counter() - self.wall_start) * self.speed
+        ts, values = self.recording.samples(self.position, target)
+        if len(ts):
+            self.SIG_UPDATE_PLOTS.emit(ts, values)
+        self.n_emitted += len(ts)
+        self.position = target
+        if self.position > self.recording.end:
+            self.stop()
@@ -0,0 +1,200 @@
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, QTimer
+import logging
+import numpy as np
+from multimeter.visa_interface import TIMEOUT_IN_SECONDS
+
+
+MAX_MESSAGE_LENGTH = 512
+MAX_STEPS = 1000000
+MESSAGES_PER_STEP = 20
+# every query of a compound message is measured before the reply is sent, so the message timeout grows with it
+MAX_QUERIES_PER_MESSAGE = 20
+
+SEQUENCE_HELP = """
+SCPI sequence, one step per line:
+    CONF:VOLT:DC 10      command
+    READ?                query, replies are collected per query
+                         consecutive commands and queries are sent as one compound message
+    WAIT 0.5             pause in seconds
+    MEASURE 10 [READ?]   repeat a query (READ? by default) n times
+    LOOP 5 ... END       repeat the enclosed steps
+    # comment
+"""
+
+
+def join_commands(commands):
+    """Compound message: commands after the first one start from the root of the command tree"""
+    message = commands[0]
+    for cmd in commands[1:]:
+        message += ";" + cmd if cmd.startswith("*") or cmd.startswith(":") else ";:" + cmd
+    return message
+
+
+def check_length(n_steps):
+    if n_steps > MAX_STEPS:
+        raise ValueError(f"Sequence is longer than {MAX_STEPS} steps")
+
+
+def parse_sequence(text):
+    """Expands loops, returns a flat list of ("write", cmd), ("query", cmd) and ("wait", seconds) steps"""
+    stack = [[]]
+    counts = []
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        words = line.split()
+        keyword = words[0].upper()
+        try:
+            if keyword == "LOOP":
+                counts.append(int(words[1]))
+                stack.append([])
+            elif keyword == "END":
+                if not counts:
+                    raise ValueError("END without LOOP")
+                body = stack.pop()
+                count = counts.pop()
+                check_length(len(stack[-1]) + len(body) * count)
+                stack[-1].extend(body * count)
+            elif keyword == "WAIT":
+                stack[-1].append(("wait", float(words[1])))
+            elif keyword == "MEASURE":
+                query = " ".join(words[2:]) or "READ?"
+                count = int(words[1])
+                check_length(len(stack[-1]) + count)
+                stack[-1].extend([("query", query)] * count)
+            elif words[0].endswith("?"):
+                # the header decides, a query can have parameters (MEAS:VOLT:DC? 10,0.001)
+                stack[-1].append(("query", line))
+            else:
+                stack[-1].append(("write", line))
+        except (IndexError, ValueError) as e:
+            raise ValueError(f"Line {line_number} \"{line}\": {e}")
+        check_length(len(stack[-1]))
+    if counts:
+        raise ValueError("LOOP without END")
+    return stack[0]
+
+
+def compile_sequence(text):
+    """
+    Merges consecutive commands and queries into compound messages, every message is one bus transaction.
+    Returns ("write", msg), ("query", msg, [queries]) and ("wait", seconds) steps,
+    the reply of a query message has one ";" separated part per query.
+    """
+    steps = []
+    commands = []
+    queries = []
+
+    def flush():
+        if queries:
+            steps.append(("query", join_commands(commands), list(queries)))
+        elif commands:
+            steps.append(("write", join_commands(commands)))
+        commands.clear()
+        queries.clear()
+
+    for step in parse_sequence(text):
+        if step[0] == "wait":
+            flush()
+            steps.append(step)
+            continue
+        # a command after a query would have to wait for the reply to be read, start a new message
+        if (step[0] == "write" and queries) or len(queries) >= MAX_QUERIES_PER_MESSAGE or \
+                (commands and len(join_commands(commands + [step[1]])) > MAX_MESSAGE_LENGTH):
+            flush()
+        commands.append(step[1])
+        if step[0] == "query":
+            queries.append(step[1])
+    flush()
+    return steps
+
+
+def parse_reply(reply):
+    try:
+        return np.array(reply.split(","), dtype=float)
+    except ValueError:
+        return reply
+
+
+class SequenceRunner(QObject):
+    """
+        Executes a compiled sequence in the thread it lives in.
+        Waits are timers, so the event loop of the thread keeps running and the sequence can be stopped.
+    """
+    SIG_FINISHED = pyqtSignal(object)
+
+    def __init__(self, interface, parent=None):
+        super().__init__(parent)
+        self.logger = logging.getLogger("Sequence")
+        self.interface = interface
+        self.steps = []
+        self.position = 0
+        self.results = {}
+        self.is_running = False
+        self.step_timer = QTimer(self)
+        self.step_timer.setSingleShot(True)
+        self.step_timer.timeout.connect(self.step)
+
+    def run(self, text):
+        if self.is_running:
+            self.logger.warning("A sequence is already running")
+            return
+        try:
+            self.steps = compile_sequence(text)
+        except ValueError as e:
+            self.logger.error(f"Sequence error: {e}")
+            self.SIG_FINISHED.emit({})
+            return
+        n_messages = sum(step[0] != "wait" for step in self.steps)
+        self.logger.info(f"Sequence started: {n_messages} messages")
+        self.position = 0
+        self.results = {}
+        self.is_running = True
+        self.step_timer.start(0)
+
+    @pyqtSlot()
+    def stop(self):
+        if self.is_running:
+            self.logger.info(f"Sequence stopped at step {self.position} of {len(self.steps)}")
+            self.finish()
+
+    def finish(self):
+        self.step_timer.stop()
+        self.is_running = False
+        results = {}
+        for query, replies in self.results.items():
+            if all(isinstance(reply, np.ndarray) for reply in replies):
+                results[query] = np.concatenate(replies)
+            else:
+                results[query] = [str(reply) for reply in replies]
+        self.SIG_FINISHED.emit(results)
+
+    @pyqtSlot()
+    def step(self):
+        n_messages = 0
+        try:
+            while self.position < len(self.steps):
+                step = self.steps[self.position]
+                self.position += 1
+                if step[0] == "wait":
+                    self.step_timer.start(int(step[1] * 1000))
+                    return
+                elif step[0] == "write":
+                    self.interface.write(step[1])
+                else:
+                    replies = self.interface.talk(step[1], timeout_s=TIMEOUT_IN_SECONDS * len(step[2])).split(";")
+                    if len(replies) != len(step[2]):
+                        raise ValueError(f"{len(step[2])} replies expected, {len(replies)} received")
+                    for query, reply in zip(step[2], replies):
+                        self.results.setdefault(query, []).append(parse_reply(reply))
+                n_messages += 1
+                if n_messages >= MESSAGES_PER_STEP:
+                    # let the event loop handle a stop request
+                    self.step_timer.start(0)
+                    return
+        except Exception as e:
+            self.logger.error(f"Sequence aborted at step {self.position}: {e}", exc_info=True)
+        else:
+            self.logger.info("Sequence finished")
+        self.finish()
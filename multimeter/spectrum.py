@@ -0,0 +1,115 @@
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+import logging
+import numpy as np
+
+
+# a sample interval longer than GAP_FACTOR x median interval is a gap, not jitter
+GAP_FACTOR = 3
+
+
+class WelchSpectrum(QObject):
+    """
+        Incremental Welch power spectral density of the reading stream.
+        Runs in its own thread, readings are collected into fixed segments (50% overlap)
+        and only the finished averaged spectrum is sent to the GUI.
+    """
+    SIG_SPECTRUM = pyqtSignal(object, object, int, float, bool)
+    # number of segments skipped because of gaps since the last reset
+    SIG_SEGMENTS_SKIPPED = pyqtSignal(int)
+
+    def __init__(self, segment_length=256, max_averages=64, jitter_tolerance=0.1):
+        super().__init__()
+        self.logger = logging.getLogger("Spectrum")
+        self.segment_length = segment_length
+        self.max_averages = max_averages
+        self.jitter_tolerance = jitter_tolerance
+        self.reset()
+
+    @pyqtSlot()
+    def reset(self):
+        self.ts = np.empty(0)
+        self.values = np.empty(0)
+        # first sample of the next segment in the buffers
+        self.start = 0
+        self.n_skipped = 0
+        self.psd = None
+        self.n_averages = 0
+        self.sample_rate = 0.0
+        self.is_resampled = False
+
+    @pyqtSlot(int)
+    def set_segment_length(self, segment_length):
+        self.segment_length = segment_length
+        self.reset()
+
+    @pyqtSlot(object, object)
+    def add_readings(self, timestamps, values):
+        self.ts = np.concatenate((self.ts, timestamps))
+        self.values = np.concatenate((self.values, values))
+        updated = False
+        n_skipped = self.n_skipped
+        while len(self.ts) - self.start >= self.segment_length:
+            updated |= self.process_segment()
+        if self.n_skipped != n_skipped:
+            self.SIG_SEGMENTS_SKIPPED.emit(self.n_skipped)
+        # the processed samples are dropped once per batch
+        self.ts = self.ts[self.start:]
+        self.values = self.values[self.start:]
+        self.start = 0
+        # the GUI gets only the latest average, not every segment of a large batch
+        if updated:
+            freqs = np.fft.rfftfreq(self.segment_length, 1 / self.sample_rate)
+            self.SIG_SPECTRUM.emit(freqs, self.psd.copy(), self.n_averages, self.sample_rate, self.is_resampled)
+
+    def process_segment(self):
+        """Adds the segment at the start of the buffers to the average, returns False if it was skipped"""
+        n = self.segment_length
+        ts = self.ts[self.start:self.start + n]
+        values = self.values[self.start:self.start + n]
+        dt = np.diff(ts)
+        median_dt = np.median(dt)
+
+        # a pause in the acquisition can't be interpolated, the next segment starts after the last gap
+        gaps = np.flatnonzero(dt > GAP_FACTOR * median_dt)
+        if len(gaps) and median_dt > 0:
+            self.logger.debug(f"Gap of {dt[gaps[-1]]:.3g} s in the readings, restarting the segment")
+            self.start += gaps[-1] + 1
+            self.n_skipped += 1
+            return False
+
+        # 50% overlap between segments
+        self.start += n // 2
+
+        # timer-based polling gives irregular timestamps, an FFT needs a uniform grid
+        if median_dt <= 0:
+            return False
+        resampled = np.max(np.abs(dt - median_dt)) > self.jitter_tolerance * median_dt
+        if resampled:
+            uniform_ts = ts[0] + median_dt * np.arange(n)
+            values = np.interp(uniform_ts, ts, values)
+        sample_rate = 1 / median_dt
+
+        # polling period has been changed, the old average is meaningless
+        if self.n_averages and abs(sample_rate - self.sample_rate) > self.jitter_tolerance * self.sample_rate:
+            self.logger.info(f"Sample rate changed to {sample_rate:.4g} Hz, restarting spectrum averaging")
+            self.psd = None
+            self.n_averages = 0
+            self.is_resampled = False
+
+        window = np.hanning(n)
+        spectrum = np.fft.rfft((values - values.mean()) * window)
+        psd = np.abs(spectrum) ** 2 / (sample_rate * np.sum(window ** 2))
+        # one-sided spectrum, DC and Nyquist bins are not doubled
+        psd[1:-1 if n % 2 == 0 else None] *= 2
+
+        if self.psd is None:
+            self.psd = psd
+            self.sample_rate = sample_rate
+        else:
+            # plain average until max_averages, then exponential averaging to follow slow changes
+            weight = 1 / min(self.n_averages + 1, self.max_averages)
+            self.psd += weight * (psd - self.psd)
+            self.sample_rate += weight * (sample_rate - self.sample_rate)
+        self.n_averages += 1
+        self.is_resampled |= bool(resampled)
+        return True
@@ -0,0 +1,119 @@
+from PyQt5.QtCore import QObject, pyqtSlot, QTimer
+from PyQt5.QtNetwork import QTcpServer, QHostAddress
+import logging
+import socket
+import struct
+import numpy as np
+
+
+STREAM_PORT = 5555
+FRAME_MAGIC = b"MMTR"
+# frame = header (magic, number of samples n, frames dropped for this client so far)
+# followed by n little-endian float64 timestamps and n float64 values
+FRAME_HEADER = struct.Struct("<4sIQ")
+
+
+def pack_payload(timestamps, values):
+    return np.asarray(timestamps, dtype="<f8").tobytes() + np.asarray(values, dtype="<f8").tobytes()
+
+
+def read_frames(host="127.0.0.1", port=STREAM_PORT):
+    """
+    Generator for external consumers, yields (timestamps, values, dropped) for every received frame
+    """
+    with socket.create_connection((host, port)) as sock:
+        stream = sock.makefile("rb")
+        while True:
+            header = stream.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                return
+            magic, n, dropped = FRAME_HEADER.unpack(header)
+            if magic != FRAME_MAGIC:
+                raise ValueError("Stream is out of sync")
+            payload = stream.read(16 * n)
+            if len(payload) < 16 * n:
+                return
+            data = np.frombuffer(payload, dtype="<f8")
+            yield data[:n], data[n:], dropped
+
+
+class StreamClient:
+    def __init__(self, socket, max_buffer_bytes):
+        self.socket = socket
+        self.max_buffer_bytes = max_buffer_bytes
+        self.dropped = 0
+
+    def send(self, n, payload):
+        # a slow consumer only loses its own frames, the server never waits for it
+        if self.socket.bytesToWrite() > self.max_buffer_bytes:
+            self.dropped += 1
+            return
+        self.socket.write(FRAME_HEADER.pack(FRAME_MAGIC, n, self.dropped) + payload)
+
+
+class StreamServer(QObject):
+    """
+        Publishes readings to local TCP subscribers in batched binary frames.
+        Lives in the acquisition thread, add_readings() only appends to the pending batch.
+    """
+
+    def __init__(self, port=STREAM_PORT, flush_period_ms=100, max_buffer_bytes=1 << 20, parent=None):
+        super().__init__(parent)
+        self.logger = logging.getLogger("Stream")
+        self.max_buffer_bytes = max_buffer_bytes
+        self.clients = {}
+        # batches are kept as arrays and concatenated once per flush
+        self.pending_ts = []
+        self.pending_values = []
+        self.server = QTcpServer(self)
+        self.server.newConnection.connect(self.on_new_connection)
+        if not self.server.listen(QHostAddress.LocalHost, port):
+            raise ConnectionError(f"Could not listen on port {port}: {self.server.errorString()}")
+        self.logger.info(f"Streaming readings on 127.0.0.1:{self.server.serverPort()}")
+        self.flush_timer = QTimer(self)
+        self.flush_timer.timeout.connect(self.flush)
+        self.flush_timer.start(flush_period_ms)
+
+    def add_readings(self, timestamps, values):
+        if self.clients:
+            self.pending_ts.append(timestamps)
+            self.pending_values.append(values)
+
+    @pyqtSlot()
+    def flush(self):
+        if not self.pending_ts:
+            return
+        timestamps, values = np.concatenate(self.pending_ts), np.concatenate(self.pending_values)
+        self.pending_ts, self.pending_values = [], []
+        payload = pack_payload(timestamps, values)
+        for client in self.clients.values():
+            client.send(len(timestamps), payload)
+
+    @pyqtSlot()
+    def on_new_connection(self):
+        while self.server.hasPendingConnections():
+            sock = self.server.nextPendingConnection()
+            idc = id(sock)
+            self.clients[idc] = StreamClient(sock, self.max_buffer_bytes)
+            sock.disconnected.connect(lambda idc=idc: self.on_disconnected(idc))
+            self.logger.info(f"Subscriber {sock.peerAddress().toString()}:{sock.peerPort()} connected")
+
+    def on_disconnected(self, idc):
+        client = self.clients.pop(idc, None)
+        if client is not None:
+            self.logger.info(f"Subscriber disconnected, {client.dropped} frames dropped")
+            client.socket.deleteLater()
+
+    def close(self):
+        self.flush_timer.stop()
+        for client in list(self.clients.values()):
+            client.socket.abort()
+        self.clients = {}
+        self.server.close()
+        self.logger.info("Streaming stopped")
+
+
+if __name__ == "__main__":
+    # minimal consumer: python -m multimeter.stream_server
+    for ts, values, dropped in read_frames():
+        print(f"{len(values)} readings, last {ts[-1]:.3f} {values[-1]:.6g}, dropped frames: {dropped}")
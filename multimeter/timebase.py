@@ -0,0 +1,40 @@
+from time import perf_counter_ns, time_ns
+import numpy as np
+
+
+class SessionClock:
+    """
+        Timestamps of one session: the wall clock is read once (anchor), all intervals come from
+        the monotonic perf_counter, so NTP steps during the session don't move the readings
+    """
+
+    def __init__(self):
+        perf_before = perf_counter_ns()
+        self.anchor_wall_ns = time_ns()
+        perf_after = perf_counter_ns()
+        self.anchor_perf_ns = (perf_before + perf_after) // 2
+
+    @staticmethod
+    def now_ns():
+        return perf_counter_ns()
+
+    def to_timestamp(self, perf_ns):
+        """Unix timestamp in seconds of a perf_counter_ns() value"""
+        return (self.anchor_wall_ns + (perf_ns - self.anchor_perf_ns)) * 1e-9
+
+    def drift_s(self):
+        """Wall clock minus session clock, e.g. NTP corrections since the anchor"""
+        return time_ns() * 1e-9 - self.to_timestamp(perf_counter_ns())
+
+    def sample_times(self, start_ns, stop_ns, n, interval_s=None):
+        """
+        Estimated timestamps of n readings returned by one request sent at start_ns and answered at stop_ns.
+        The readings are centered at the midpoint of the request, spaced by the instrument's sample interval
+        if it is known, otherwise spread evenly over the request.
+        """
+        midpoint = self.to_timestamp((start_ns + stop_ns) // 2)
+        if n == 1:
+            return np.array([midpoint])
+        if interval_s is None:
+            interval_s = (stop_ns - start_ns) * 1e-9 / n
+        return midpoint + (np.arange(n) - (n - 1) / 2) * interval_s
@@ -1,5 +1,6 @@
 import pyvisa
 import logging
+from multimeter.profiler import PROFILER
 
 
 TIMEOUT_IN_SECONDS = 5
@@ -24,16 +25,27 @@ class VISAInterface:
 
     def write(self, cmd):
         self.logger.debug(cmd)
-        self.inst.write(cmd)
+        with PROFILER.stage("VISAInterface.write"):
+            self.inst.write(cmd)
 
     def read(self):
         reply = self.inst.read_raw()
         self.logger.debug(reply)
         return reply
 
-    def talk(self, cmd):
+    def talk(self, cmd, timeout_s=None):
+        """timeout_s replaces TIMEOUT_IN_SECONDS for this query only, e.g. for a compound message of slow queries"""
         self.logger.debug(cmd)
-        reply = self.inst.query(cmd)
+        with PROFILER.stage("VISAInterface.talk"):
+            if timeout_s is None:
+                reply = self.inst.query(cmd)
+            else:
+                timeout = self.inst.timeout
+                self.inst.timeout = timeout_s * 1000
+                try:
+                    reply = self.inst.query(cmd)
+                finally:
+                    self.inst.timeout = timeout
         self.logger.debug(reply.strip())
         return reply.strip()
 
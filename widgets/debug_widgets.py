@@ -1,8 +1,13 @@
 from PyQt5.QtWidgets import QLabel, QWidget, QHBoxLayout, QLineEdit, QPlainTextEdit, \
-    QPushButton, QVBoxLayout, QComboBox, QSpacerItem, QSizePolicy
+    QPushButton, QVBoxLayout, QComboBox, QSpacerItem, QSizePolicy, QFileDialog
 from PyQt5.QtCore import pyqtSlot, pyqtSignal, QObject
+from PyQt5.QtGui import QTextCursor
 import logging
+from collections import deque
+import numpy as np
 from io import StringIO
+from multimeter.profiler import PROFILER
+from multimeter.sequence import SEQUENCE_HELP
 
 
 def make_html_compatible(text_str):
@@ -12,29 +17,87 @@ def make_html_compatible(text_str):
     return text_str.strip().replace(">", "\u2B9E").replace("<", "\u2B9C")
 
 
+class BufferedPlainTextEdit(QPlainTextEdit):
+    """
+        Read-only text view that keeps new messages in a buffer while it is hidden
+        and appends all of them at once when it is visible again.
+        Both the view and the buffer keep only the last max_blocks messages.
+    """
+
+    def __init__(self, *args, max_blocks=10000, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.setReadOnly(True)
+        self.setMaximumBlockCount(max_blocks)
+        self.rendering_enabled = True
+        self.pending_html = deque(maxlen=max_blocks)
+
+    def append_html(self, html):
+        if self.rendering_enabled:
+            self.appendHtml(html)
+        else:
+            self.pending_html.append(html)
+
+    def set_rendering_enabled(self, enabled):
+        self.rendering_enabled = enabled
+        if enabled and self.pending_html:
+            self.flush_pending()
+
+    def flush_pending(self):
+        # one block per message (as appendHtml does) in a single edit block, so the layout is updated once
+        scrollbar = self.verticalScrollBar()
+        at_bottom = scrollbar.value() == scrollbar.maximum()
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        for html in self.pending_html:
+            if not self.document().isEmpty():
+                cursor.insertBlock()
+            cursor.insertHtml(html)
+        cursor.endEditBlock()
+        self.pending_html.clear()
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+
+    @pyqtSlot()
+    def clear(self):
+        self.pending_html.clear()
+        super().clear()
+
+
 class CommunicationWidget(QWidget):
     SIG_RAW_CMD_SEND = pyqtSignal(str)
+    SIG_RUN_SEQUENCE = pyqtSignal(str)
+    SIG_STOP_SEQUENCE = pyqtSignal()
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, sequence_directory="", **kwargs):
         super().__init__(*args, **kwargs)
+        self.sequence_directory = sequence_directory
+        self.is_sequence_running = False
         self.user_text_input = QLineEdit()
         self.user_text_input.setPlaceholderText("Command to send. Examples: *IDN?, *CLS, READ? CONF:VOLT, CONF:RES")
         self.user_text_input.returnPressed.connect(self.send_cmd)
         self.btn_send = QPushButton("Send")
         self.btn_send.setObjectName("Operation")
         self.btn_send.clicked.connect(self.send_cmd)
+        self.btn_sequence = QPushButton("Run sequence...")
+        self.btn_sequence.setObjectName("Operation")
+        self.btn_sequence.setToolTip(SEQUENCE_HELP.strip())
+        self.btn_sequence.clicked.connect(self.on_sequence_pressed)
         self.message_layout = QHBoxLayout()
         self.message_layout.addWidget(self.user_text_input)
         self.message_layout.addWidget(self.btn_send)
+        self.message_layout.addWidget(self.btn_sequence)
 
-        self.response_view = QPlainTextEdit()
-        self.response_view.setReadOnly(True)
+        self.response_view = BufferedPlainTextEdit()
         self.main_layout = QVBoxLayout()
         self.main_layout.addWidget(self.response_view)
         self.main_layout.addLayout(self.message_layout)
         self.setLayout(self.main_layout)
         self.return_press_enabled = True
 
+    def set_rendering_enabled(self, enabled):
+        self.response_view.set_rendering_enabled(enabled)
+
     @pyqtSlot()
     def send_cmd(self):
         if self.return_press_enabled:
@@ -43,13 +106,47 @@ class CommunicationWidget(QWidget):
             html = "<font color=\"LightSkyBlue\">" + \
                    make_html_compatible(">>> " + msg) + \
                    "</font>"
-            self.response_view.appendHtml(html)
+            self.response_view.append_html(html)
             self.SIG_RAW_CMD_SEND.emit(msg.strip())
 
     @pyqtSlot(str)
     def on_reply_received(self, msg):
         html = "<font color=\"Orange\">" + make_html_compatible("<<< " + msg) + "</font>"
-        self.response_view.appendHtml(html)
+        self.response_view.append_html(html)
+
+    @pyqtSlot()
+    def on_sequence_pressed(self):
+        if self.is_sequence_running:
+            self.SIG_STOP_SEQUENCE.emit()
+            return
+        filename = QFileDialog.getOpenFileName(
+            self,
+            caption="Select SCPI sequence",
+            directory=self.sequence_directory,
+            filter="SCPI sequences (*.scpi *.txt)"
+        )[0]
+        if filename:
+            with open(filename, "r") as file:
+                text = file.read()
+            self.is_sequence_running = True
+            self.btn_sequence.setText("Stop sequence")
+            html = "<font color=\"LightSkyBlue\">" + make_html_compatible(">>> sequence " + filename) + "</font>"
+            self.response_view.append_html(html)
+            self.SIG_RUN_SEQUENCE.emit(text)
+
+    @pyqtSlot(object)
+    def on_sequence_finished(self, results):
+        self.is_sequence_running = False
+        self.btn_sequence.setText("Run sequence...")
+        for query, replies in results.items():
+            if isinstance(replies, np.ndarray) and len(replies) > 1:
+                msg = f"{query} {len(replies)} values, mean {replies.mean():.6g}, std {replies.std():.3g}, " \
+                      f"min {replies.min():.6g}, max {replies.max():.6g}"
+            elif isinstance(replies, np.ndarray):
+                msg = f"{query} {replies[0]:.6g}" if len(replies) else f"{query} no values"
+            else:
+                msg = f"{query} " + ", ".join(replies)
+            self.on_reply_received(msg)
 
 
 class SimpleLogObject(QObject):
@@ -81,8 +178,7 @@ class LoggerWidget(QWidget):
         self.log_buffer.qlog.SIG_MSG.connect(self.on_logger_message)
         self.logger = logging.getLogger()
         self.logger.addHandler(self.log_handler)
-        self.log_view = QPlainTextEdit()
-        self.log_view.setReadOnly(True)
+        self.log_view = BufferedPlainTextEdit()
         self.clear_button = QPushButton("Clear")
         self.clear_button.setObjectName("Operation")
         self.clear_button.clicked.connect(self.log_view.clear)
@@ -99,27 +195,34 @@ class LoggerWidget(QWidget):
         self.main_layout.addLayout(self.buttons_layout)
         self.setLayout(self.main_layout)
 
+    def set_rendering_enabled(self, enabled):
+        self.log_view.set_rendering_enabled(enabled)
+
     @pyqtSlot(str)
     def set_logger_level(self, lvl="DEBUG"):
         self.logger.setLevel(lvl)
 
     @pyqtSlot(str)
     def on_logger_message(self, msg):
+        with PROFILER.stage("LoggerWidget.on_logger_message"):
+            self.append_log_message(msg)
+
+    def append_log_message(self, msg):
         msg = make_html_compatible(msg)
         level = msg.split(" ")[2]
         if level == "ERROR":
             msg = "<font color=\"DeepPink\">" + msg + "</font>"
-            self.log_view.appendHtml(msg)
+            self.log_view.append_html(msg)
         elif level == "WARNING":
             msg = "<font color=\"Yellow\">" + msg + "</font>"
-            self.log_view.appendHtml(msg)
+            self.log_view.append_html(msg)
         elif level == "DEBUG":
             msg = "<font color=\"Lime\">" + msg + "</font>"
-            self.log_view.appendHtml(msg)
+            self.log_view.append_html(msg)
         elif level == "INFO":
             msg = "<font color=\"Aqua\">" + msg + "</font>"
-            self.log_view.appendHtml(msg)
+            self.log_view.append_html(msg)
         else:
             msg = "<font color=\"White\">" + msg + "</font>"
-            self.log_view.appendHtml(msg)
+            self.log_view.append_html(msg)
 
@@ -1,15 +1,51 @@
 from PyQt5.QtWidgets import QApplication, QTabWidget, QLabel
 from PyQt5.QtCore import pyqtSlot, QEvent, QMetaObject, Qt, Q_ARG
+from PyQt5 import sip
 
 
 class DetachableTabWidget(QTabWidget):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.tabBarDoubleClicked.connect(self.detach_tab)
+        self.currentChanged.connect(self.update_rendering)
         # self.setMovable(True)
         self.widgets_by_id = {}
         self.texts_by_id = {}
         self.indexes_by_id = {}
+        self.watched_window = None
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # the main window is only known when the widget is shown, minimizing it hides all tabs
+        if self.watched_window is not self.window():
+            self.watched_window = self.window()
+            self.watched_window.installEventFilter(self)
+        self.update_rendering()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.update_rendering()
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.WindowStateChange:
+            self.update_rendering()
+        return super().eventFilter(obj, event)
+
+    @pyqtSlot()
+    def update_rendering(self):
+        """
+        Widgets which support set_rendering_enabled() only redraw when somebody can see them:
+        the current tab of a visible window or a detached window which is not minimized
+        """
+        for widget in self.widgets_by_id.values():
+            # widgets are deleted one by one when the main window is closed
+            if sip.isdeleted(widget) or not hasattr(widget, "set_rendering_enabled"):
+                continue
+            if widget.isWindow():
+                visible = widget.isVisible() and not widget.isMinimized()
+            else:
+                visible = widget is self.currentWidget() and self.isVisible() and not self.window().isMinimized()
+            widget.set_rendering_enabled(visible)
 
     @pyqtSlot(int)
     def tabInserted(self, index: int):
@@ -32,12 +68,15 @@ class DetachableTabWidget(QTabWidget):
             else:
                 target_index += 1
         self.insertTab(target_index, self.widgets_by_id[idw], self.texts_by_id[idw])
+        self.update_rendering()
 
     @pyqtSlot(QEvent, object)
     def custom_close_event(self, event, idw=None):
         widget = self.widgets_by_id[idw]
+        widget.removeEventFilter(self)
         widget.resize(100, 100)
         widget.setParent(self)
+        self.update_rendering()
 
         # it looks like insertTab() doesn't work properly with a direct call
         # and the event loop has to finish closeEvent before insertTab() call
@@ -56,7 +95,9 @@ class DetachableTabWidget(QTabWidget):
         widget.setWindowIcon(icon)
         widget.setWindowTitle(text)
         widget.setStyleSheet(self.window().styleSheet())
+        widget.installEventFilter(self)
         widget.show()
+        self.update_rendering()
 
 
 if __name__ == '__main__':
@@ -4,6 +4,7 @@ from PyQt5.QtWidgets import QApplication, QMenu, QAction, QActionGroup, \
 from PyQt5.QtCore import Qt, pyqtSlot, pyqtSignal
 import pyqtgraph as pg
 from time import time
+from multimeter.profiler import PROFILER
 
 
 class Trend1D(pg.GraphicsLayoutWidget):
@@ -40,6 +41,8 @@ class Trend1D(pg.GraphicsLayoutWidget):
         self.restore_leg_pos_action.triggered.connect(self.restore_legend_position)
         self.pw.vb.menu.addAction(self.restore_leg_pos_action)
         self.max_points = 5000
+        self.rendering_enabled = True
+        self.needs_redraw = False
 
     @pyqtSlot(dict)
     def add_curve_data(self, curve_data_dict):
@@ -67,17 +70,47 @@ class Trend1D(pg.GraphicsLayoutWidget):
                 self.data_dict[c_name]["x"] = self.data_dict[c_name]["x"][-self.max_points:]
                 self.data_dict[c_name]["y"] = self.data_dict[c_name]["y"][-self.max_points:]
             if self.data_dict[c_name]["enabled"]:
-                self.data_dict[c_name]["curve"].setData(
-                    self.data_dict[c_name]["x"],
-                    self.data_dict[c_name]["y"])
+                if self.rendering_enabled:
+                    with PROFILER.stage("Trend1D.setData"):
+                        self.data_dict[c_name]["curve"].setData(
+                            self.data_dict[c_name]["x"],
+                            self.data_dict[c_name]["y"])
+                else:
+                    self.needs_redraw = True
+
+    def set_curve_data(self, c_name, x, y):
+        """Replaces the curve data instead of appending to it"""
+        if c_name not in self.data_dict:
+            return
+        self.data_dict[c_name]["x"] = x
+        self.data_dict[c_name]["y"] = y
+        if self.data_dict[c_name]["enabled"]:
+            if self.rendering_enabled:
+                with PROFILER.stage("Trend1D.setData"):
+                    self.data_dict[c_name]["curve"].setData(x, y)
+            else:
+                self.needs_redraw = True
 
     def update_ups(self, ts):
         self.n_updates += 1
         if ts - self.last_update_time >= 1:  # 1s
-            self.fps_label.setText(f"{self.n_updates / (ts - self.last_update_time) : .2f} fps")
+            if self.rendering_enabled:
+                self.fps_label.setText(f"{self.n_updates / (ts - self.last_update_time) : .2f} fps")
             self.last_update_time = ts
             self.n_updates = 0
 
+    def set_rendering_enabled(self, enabled):
+        """
+        Data is still collected while the plot is hidden, curves are redrawn once it is visible again
+        """
+        self.rendering_enabled = enabled
+        if enabled and self.needs_redraw:
+            self.needs_redraw = False
+            for curve_data in self.data_dict.values():
+                if curve_data["enabled"]:
+                    with PROFILER.stage("Trend1D.setData"):
+                        curve_data["curve"].setData(curve_data["x"], curve_data["y"])
+
     @pyqtSlot(str)
     def clear_curve_data(self, c_name):
         if c_name in self.data_dict:
@@ -150,6 +183,9 @@ class GraphWidget(QWidget):
         self.setMinimumSize(400, 300)
         self.clear_button.clicked.connect(self.plot.clear_all_curves)
 
+    def set_rendering_enabled(self, enabled):
+        self.plot.set_rendering_enabled(enabled)
+
     @pyqtSlot(str, str, bool)
     def add_or_remove_curve(self, c_name, color, enabled):
         if c_name not in self.plot.data_dict:
@@ -159,6 +195,92 @@ class GraphWidget(QWidget):
             self.plot.enable_curve(c_name, enabled)
 
 
+class SpectrumWidget(QWidget):
+    """
+        Power spectral density of the readings, the spectrum itself is computed outside the GUI thread
+    """
+    SIG_RESET = pyqtSignal()
+    SIG_SET_SEGMENT_LENGTH = pyqtSignal(int)
+
+    def __init__(self, segment_lengths=(64, 128, 256, 512, 1024, 2048, 4096), default_length=256):
+        super().__init__()
+        self.layout = QVBoxLayout(self)
+        self.plot = pg.PlotWidget(labels={"bottom": ("Frequency", "Hz"), "left": "PSD [unit\u00b2/Hz]"})
+        self.plot.setLogMode(x=True, y=True)
+        self.plot.showGrid(x=True, y=True, alpha=0.3)
+        self.curve = self.plot.plot([], pen="#ff7")
+        self.info_label = QLabel("Waiting for data...")
+        self.segment_box = QComboBox()
+        self.segment_box.addItems([str(n) for n in segment_lengths])
+        self.segment_box.setCurrentText(str(default_length))
+        self.segment_box.currentTextChanged.connect(self.on_segment_length_changed)
+        self.reset_button = QPushButton("Reset averaging")
+        self.reset_button.setObjectName("Operation")
+        self.reset_button.clicked.connect(self.reset)
+        self.bottom_layout = QHBoxLayout()
+        self.bottom_layout.addWidget(self.info_label)
+        self.bottom_layout.addStretch()
+        self.bottom_layout.addWidget(QLabel("Segment length:"))
+        self.bottom_layout.addWidget(self.segment_box)
+        self.bottom_layout.addWidget(self.reset_button)
+        self.layout.addWidget(self.plot)
+        self.layout.addLayout(self.bottom_layout)
+        self.setMinimumSize(400, 300)
+        self.rendering_enabled = True
+        self.last_spectrum = None
+        self.spectrum_info = "Waiting for data..."
+        self.n_skipped = 0
+
+    def set_rendering_enabled(self, enabled):
+        self.rendering_enabled = enabled
+        if enabled and self.last_spectrum is not None:
+            self.on_spectrum(*self.last_spectrum)
+
+    def clear(self):
+        self.last_spectrum = None
+        self.curve.setData([], [])
+        self.spectrum_info = "Waiting for data..."
+        self.n_skipped = 0
+        self.update_info()
+
+    @pyqtSlot()
+    def reset(self):
+        self.clear()
+        self.SIG_RESET.emit()
+
+    @pyqtSlot(str)
+    def on_segment_length_changed(self, text):
+        self.clear()
+        self.SIG_SET_SEGMENT_LENGTH.emit(int(text))
+
+    def update_info(self):
+        info = self.spectrum_info
+        if self.n_skipped:
+            # e.g. buffered readings (SAMP:COUN) shorter than the segment, polled with pauses in between
+            info += f", {self.n_skipped} segments with gaps in the readings skipped"
+        self.info_label.setText(info)
+
+    @pyqtSlot(int)
+    def on_segments_skipped(self, n_skipped):
+        self.n_skipped = n_skipped
+        self.update_info()
+
+    @pyqtSlot(object, object, int, float, bool)
+    def on_spectrum(self, freqs, psd, n_averages, sample_rate, resampled):
+        if not self.rendering_enabled:
+            # only the latest spectrum matters, it is drawn when the tab is visible again
+            self.last_spectrum = (freqs, psd, n_averages, sample_rate, resampled)
+            return
+        self.last_spectrum = None
+        # DC bin can't be shown on the log axis
+        self.curve.setData(freqs[1:], psd[1:])
+        info = f"{n_averages} averages, fs = {sample_rate:.4g} Hz"
+        if resampled:
+            info += ", irregular timestamps (resampled)"
+        self.spectrum_info = info
+        self.update_info()
+
+
 if __name__ == "__main__":
     app = QApplication([])
     import random
@@ -0,0 +1,80 @@
+from PyQt5.QtWidgets import QWidget, QHBoxLayout, QVBoxLayout, QPushButton, QLabel, QCheckBox, QSpinBox, \
+    QTableWidget, QTableWidgetItem, QHeaderView
+from PyQt5.QtCore import pyqtSlot, Qt, QTimer
+from multimeter.profiler import PROFILER
+
+
+class ProfilerWidget(QWidget):
+    """
+        Rolling per-stage timings and stack sampling snapshots saved to the logs directory
+    """
+    COLUMNS = ["Stage", "Thread", "Calls", "Mean [ms]", "P95 [ms]", "Max [ms]", "Load [%]"]
+
+    def __init__(self, snapshot_directory, refresh_period_ms=1000):
+        super().__init__()
+        self.snapshot_directory = snapshot_directory
+        self.rendering_enabled = True
+        self.enable_box = QCheckBox("Enable profiling")
+        self.enable_box.setChecked(PROFILER.enabled)
+        self.enable_box.toggled.connect(self.on_enable_toggled)
+        self.snapshot_box = QSpinBox()
+        self.snapshot_box.setSuffix(" s")
+        self.snapshot_box.setRange(1, 600)
+        self.snapshot_box.setValue(10)
+        self.snapshot_button = QPushButton("Take snapshot")
+        self.snapshot_button.setObjectName("Operation")
+        self.snapshot_button.clicked.connect(self.on_snapshot_pressed)
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.top_layout = QHBoxLayout()
+        self.top_layout.addWidget(self.enable_box)
+        self.top_layout.addStretch()
+        self.top_layout.addWidget(QLabel("Stack sampling:"))
+        self.top_layout.addWidget(self.snapshot_box)
+        self.top_layout.addWidget(self.snapshot_button)
+        self.main_layout = QVBoxLayout()
+        self.main_layout.addLayout(self.top_layout)
+        self.main_layout.addWidget(self.table)
+        self.setLayout(self.main_layout)
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(refresh_period_ms)
+
+    def set_rendering_enabled(self, enabled):
+        self.rendering_enabled = enabled
+        if enabled:
+            self.refresh()
+
+    @pyqtSlot(bool)
+    def on_enable_toggled(self, enable):
+        PROFILER.enable(enable)
+        self.refresh()
+
+    @pyqtSlot()
+    def on_snapshot_pressed(self):
+        PROFILER.take_snapshot(self.snapshot_box.value(), self.snapshot_directory)
+
+    @pyqtSlot()
+    def refresh(self):
+        if not self.rendering_enabled:
+            return
+        stats = sorted(PROFILER.stats(), key=lambda stage: stage["load"], reverse=True)
+        self.table.setRowCount(len(stats))
+        for row, stage in enumerate(stats):
+            cells = [
+                stage["stage"],
+                stage["thread"],
+                str(stage["calls"]),
+                f"{stage['mean_ms']:.3f}",
+                f"{stage['p95_ms']:.3f}",
+                f"{stage['max_ms']:.3f}",
+                f"{100 * stage['load']:.1f}",
+            ]
+            for col, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                if col > 1:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, col, item)
@@ -0,0 +1,123 @@
+from PyQt5.QtWidgets import QWidget, QHBoxLayout, QVBoxLayout, QPushButton, QLabel, QFileDialog, QDoubleSpinBox
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, QTimer
+import logging
+from widgets.pg_widgets import GraphWidget
+
+
+class RecordingWidget(QWidget):
+    """
+        Browsing of recorded files: only the visible time window is read and decimated for the plot
+    """
+    SIG_OPEN = pyqtSignal(object)
+    SIG_REPLAY = pyqtSignal(object, float)
+    SIG_STOP_REPLAY = pyqtSignal()
+
+    def __init__(self, directory="", max_points=5000):
+        super().__init__()
+        self.logger = logging.getLogger("Recording")
+        self.directory = directory
+        self.max_points = max_points
+        self.recording = None
+        self.is_replaying = False
+        self.last_range = None
+
+        self.graph_widget = GraphWidget()
+        self.plot = self.graph_widget.plot
+        self.plot.add_curve("Reading", "#ff7")
+        self.graph_widget.clear_button.hide()
+        self.open_button = QPushButton("Open recording")
+        self.info_label = QLabel("No recording")
+        self.speed_box = QDoubleSpinBox()
+        self.speed_box.setPrefix(u"×")
+        self.speed_box.setDecimals(1)
+        self.speed_box.setRange(0.1, 10000)
+        self.speed_box.setValue(10)
+        self.replay_button = QPushButton(u"▶ Replay to Trend")
+        self.replay_button.setEnabled(False)
+        self.top_layout = QHBoxLayout()
+        self.top_layout.addWidget(self.open_button)
+        self.top_layout.addWidget(self.info_label)
+        self.top_layout.addStretch()
+        self.top_layout.addWidget(QLabel("Speed:"))
+        self.top_layout.addWidget(self.speed_box)
+        self.top_layout.addWidget(self.replay_button)
+        self.layout = QVBoxLayout(self)
+        self.layout.setContentsMargins(0, 0, 0, 0)
+        self.layout.addLayout(self.top_layout)
+        self.layout.addWidget(self.graph_widget)
+
+        # plot range changes come in bursts while zooming, the window is reloaded once they stop
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(50)
+        self.reload_timer.timeout.connect(self.load_visible_window)
+        self.plot.pw.sigXRangeChanged.connect(self.reload_timer.start)
+        self.open_button.clicked.connect(self.select_files)
+        self.replay_button.clicked.connect(self.on_replay_pressed)
+
+    def set_rendering_enabled(self, enabled):
+        self.plot.set_rendering_enabled(enabled)
+
+    @pyqtSlot()
+    def select_files(self):
+        filenames = QFileDialog.getOpenFileNames(
+            self,
+            caption="Open recording (one or several segments)",
+            directory=self.directory,
+            filter="Data files (*.csv *.xlsx *.dat *.txt *.bin)"
+        )[0]
+        if filenames:
+            self.open_recording(filenames)
+
+    def open_recording(self, filenames):
+        # the recording is opened in the replay thread, first indexing of a large text file takes a while
+        self.open_button.setEnabled(False)
+        self.replay_button.setEnabled(False)
+        self.info_label.setText("Opening...")
+        self.SIG_OPEN.emit(filenames)
+
+    @pyqtSlot(str)
+    def on_open_progress(self, text):
+        self.info_label.setText(text)
+
+    @pyqtSlot(object)
+    def on_recording_opened(self, recording):
+        self.open_button.setEnabled(True)
+        if recording is None:
+            self.info_label.setText("Could not open the recording")
+            self.replay_button.setEnabled(self.recording is not None)
+            return
+        self.recording = recording
+        n = len(self.recording)
+        self.info_label.setText(f"{len(self.recording.segments)} segment(s), {n} readings")
+        self.replay_button.setEnabled(n > 0)
+        self.last_range = None
+        self.plot.pw.enableAutoRange()
+        self.set_window(self.recording.start, self.recording.end)
+
+    @pyqtSlot()
+    def load_visible_window(self):
+        if self.recording is None:
+            return
+        x_range = tuple(self.plot.pw.viewRange()[0])
+        if x_range != self.last_range:
+            self.set_window(*x_range)
+
+    def set_window(self, t_start, t_stop):
+        self.last_range = (t_start, t_stop)
+        ts, values = self.recording.window(t_start, t_stop, self.max_points)
+        self.plot.set_curve_data("Reading", ts, values)
+
+    @pyqtSlot()
+    def on_replay_pressed(self):
+        if self.is_replaying:
+            self.SIG_STOP_REPLAY.emit()
+        else:
+            self.is_replaying = True
+            self.replay_button.setText(u"\U0001F7E5 Stop replay")
+            self.SIG_REPLAY.emit(self.recording, self.speed_box.value())
+
+    @pyqtSlot()
+    def on_replay_finished(self):
+        self.is_replaying = False
+        self.replay_button.setText(u"▶ Replay to Trend")